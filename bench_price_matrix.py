@@ -0,0 +1,97 @@
+import sys
+import os
+import json
+import tempfile
+import subprocess
+from datetime import date, timedelta
+
+import numpy as np
+
+# Налаштування
+YEARS = [1, 2, 4]
+ACTIVE_SKUS = 1300      # приблизно стільки товарів у файлі зараз
+NEW_SKUS_PER_DAY = 4    # нові товари, що з'являються щодня
+SKU_LIFETIME_DAYS = 180  # скільки в середньому товар є в наявності
+SEED = 42
+
+CASES = {
+    'pd.read_csv': "pd.read_csv(path, encoding='utf-8-sig')",
+    'load_prices': "price_matrix.load_prices(path)",
+    'load_prices last=30': "price_matrix.load_prices(path, last=30)",
+    'load_price_matrix': "price_matrix.load_price_matrix(path)",
+}
+
+
+def generate_file(path, years):
+    """
+    Синтетичний широкий CSV: одна колонка на день, кожен SKU має ціни лише
+    протягом свого "життя", тож більшість клітинок порожні, як у реальних файлах.
+    """
+    rng = np.random.default_rng(SEED)
+    days = 365 * years
+    start = date(2025, 1, 1)
+    dates = [(start + timedelta(days=i)).strftime('%Y-%m-%d') for i in range(days)]
+
+    sku_count = ACTIVE_SKUS + NEW_SKUS_PER_DAY * days
+    first_day = np.concatenate([
+        rng.integers(-SKU_LIFETIME_DAYS, 1, ACTIVE_SKUS),
+        np.repeat(np.arange(days), NEW_SKUS_PER_DAY)
+    ])
+    last_day = first_day + rng.integers(SKU_LIFETIME_DAYS // 2, SKU_LIFETIME_DAYS * 2, sku_count)
+    base_price = rng.integers(90, 3000, sku_count).astype(np.float32)
+
+    day_index = np.arange(days)
+    categories = np.array(['MainLine', 'Premium', 'RLC', 'Matchbox', 'Treasure Hunts'])
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        f.write(','.join(['sku', 'category', 'car_name', 'image_url'] + dates) + '\n')
+        for i in range(sku_count):
+            alive = (day_index >= first_day[i]) & (day_index <= last_day[i])
+            prices = np.where(alive, base_price[i], np.nan)
+            cells = ['' if np.isnan(p) else f"{p:.1f}" for p in prices]
+            meta = [f"SKU{i:05d}", categories[i % len(categories)], f"Car model {i} 1:64",
+                    f"https://retromagaz.com/uploads/products/{i % 97:02d}/site_{i:08d}.webp"]
+            f.write(','.join(meta + cells) + '\n')
+    return sku_count, days
+
+
+def measure(path, case):
+    """Запускає один варіант завантаження в окремому процесі, щоб виміряти пік RSS."""
+    code = f"""
+import json, resource, time
+import pandas as pd
+import price_matrix
+path = {path!r}
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+result = {CASES[case]}
+elapsed = time.perf_counter() - start
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{'seconds': elapsed, 'peak_mb': (peak - before) / 1024}}))
+"""
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    years_list = [int(arg) for arg in sys.argv[1:]] or YEARS
+
+    print("📏 Бенчмарк завантаження цін (синтетичні файли)")
+    print("=" * 78)
+    print(f"{'Роки':>4} {'SKU':>6} {'Дат':>5} {'MB':>6}  {'Варіант':<22} {'Час, с':>8} {'Пік RSS, MB':>12}")
+    print("-" * 78)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for years in years_list:
+            path = os.path.join(tmp_dir, f"prices_{years}y.csv")
+            sku_count, days = generate_file(path, years)
+            size_mb = os.path.getsize(path) / 1024 / 1024
+            for case in CASES:
+                result = measure(path, case)
+                print(f"{years:>4} {sku_count:>6} {days:>5} {size_mb:>6.1f}  {case:<22} "
+                      f"{result['seconds']:>8.2f} {result['peak_mb']:>12.1f}")
+            print("-" * 78)
+
+
+if __name__ == "__main__":
+    main()
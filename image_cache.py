@@ -0,0 +1,214 @@
+import requests
+import hashlib
+import json
+import os
+import sys
+import threading
+from io import BytesIO
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from PIL import Image
+
+import price_matrix
+from price_finder import HEADERS, BUY_OUTPUT_FILE, SELL_OUTPUT_FILE, log_error
+
+# Налаштування
+THUMBS_DIR = os.path.join("images", "thumbs")
+MANIFEST_FILE = "image_manifest.json"
+THUMB_SIZE = (120, 120)  # зображення на сторінках 60-80px, запас для HiDPI
+THUMB_FORMAT = "WEBP"
+THUMB_QUALITY = 80
+IMAGE_WORKERS = 8
+
+# Хеші, для яких мініатюра вже створюється іншим потоком
+THUMBS_IN_PROGRESS = set()
+THUMBS_LOCK = threading.Lock()
+
+
+def load_manifest(file_path=MANIFEST_FILE):
+    """
+    Маніфест: {image_url: {'sha256', 'thumb', 'etag', 'last_modified', 'updated'}}.
+    Для зображень, які не вдалось обробити, - також 'failed' і 'last_error'.
+    """
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_manifest(manifest, file_path=MANIFEST_FILE):
+    tmp_path = file_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp_path, file_path)
+
+
+def collect_image_urls(csv_files):
+    """Повертає відсортований список унікальних image_url з CSV файлів."""
+    urls = set()
+    for file_path in csv_files:
+        try:
+            df = price_matrix.load_prices(file_path, columns=['image_url'], dates=[])
+        except FileNotFoundError:
+            continue
+        urls.update(url for url in df['image_url'].dropna() if str(url).startswith('http'))
+    return sorted(urls)
+
+
+def thumb_path_for(digest):
+    # Розкладаємо по підпапках, щоб не тримати тисячі файлів в одній
+    return os.path.join(THUMBS_DIR, digest[:2], f"{digest}.{THUMB_FORMAT.lower()}").replace(os.sep, '/')
+
+
+def make_thumbnail(content, thumb_path):
+    with Image.open(BytesIO(content)) as image:
+        image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+        image.thumbnail(THUMB_SIZE)
+        os.makedirs(os.path.dirname(thumb_path), exist_ok=True)
+        tmp_path = thumb_path + '.tmp'
+        image.save(tmp_path, THUMB_FORMAT, quality=THUMB_QUALITY)
+        os.replace(tmp_path, thumb_path)
+
+
+def process_image(url, entry):
+    """
+    Завантажує одне зображення і створює мініатюру.
+    Повертає (url, новий запис маніфесту, статус), де статус: unchanged / dedup / created.
+    """
+    headers = dict(HEADERS)
+    if entry and os.path.exists(entry.get('thumb', '')):
+        # Умовний запит: сервер відповість 304, якщо зображення не змінилось
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+
+    response = requests.get(url, headers=headers, timeout=15)
+    if response.status_code == 304:
+        return url, {key: value for key, value in entry.items() if key not in ('failed', 'last_error')}, 'unchanged'
+    response.raise_for_status()
+
+    digest = hashlib.sha256(response.content).hexdigest()
+    thumb_path = thumb_path_for(digest)
+    new_entry = {
+        'sha256': digest,
+        'thumb': thumb_path,
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+        'updated': datetime.now().strftime('%Y-%m-%d')
+    }
+
+    if entry and entry.get('sha256') == digest and os.path.exists(thumb_path):
+        return url, {**new_entry, 'updated': entry.get('updated')}, 'unchanged'
+
+    with THUMBS_LOCK:
+        if os.path.exists(thumb_path) or digest in THUMBS_IN_PROGRESS:
+            # Той самий вміст під іншим URL - мініатюра вже є
+            return url, new_entry, 'dedup'
+        THUMBS_IN_PROGRESS.add(digest)
+
+    try:
+        make_thumbnail(response.content, thumb_path)
+    finally:
+        with THUMBS_LOCK:
+            THUMBS_IN_PROGRESS.discard(digest)
+    return url, new_entry, 'created'
+
+
+def needs_processing(entry):
+    if not entry:
+        return True
+    # Зображення з помилкою (404, не зображення) повторюється лише з --refresh
+    if entry.get('failed'):
+        return False
+    return not os.path.exists(entry.get('thumb', ''))
+
+
+def remove_orphan_thumbnails(manifest):
+    """
+    Видаляє мініатюри, на які не посилається жоден запис маніфесту
+    (зображення за URL змінилось), щоб вони не накопичувались у репозиторії.
+    """
+    referenced = {entry['thumb'] for entry in manifest.values() if entry and entry.get('thumb')}
+    removed = 0
+    for dir_path, _, file_names in os.walk(THUMBS_DIR, topdown=False):
+        for file_name in file_names:
+            thumb_path = os.path.join(dir_path, file_name).replace(os.sep, '/')
+            if thumb_path not in referenced:
+                os.remove(thumb_path)
+                removed += 1
+        if dir_path != THUMBS_DIR and not os.listdir(dir_path):
+            os.rmdir(dir_path)
+    return removed
+
+
+def update_image_cache(csv_files=(BUY_OUTPUT_FILE, SELL_OUTPUT_FILE), manifest_file=MANIFEST_FILE,
+                       refresh=False, prune=True):
+    """
+    Оновлює локальні мініатюри для всіх image_url з CSV.
+    Без refresh завантажуються лише нові URL; з refresh - усі, але з умовними запитами,
+    тому незмінені зображення не перекачуються і не перераховуються.
+    prune - видаляє з маніфесту URL, яких уже немає в жодному з csv_files.
+    """
+    os.makedirs(THUMBS_DIR, exist_ok=True)
+    manifest = load_manifest(manifest_file)
+    urls = collect_image_urls(csv_files)
+    todo = [url for url in urls if refresh or needs_processing(manifest.get(url))]
+    skipped = 0 if refresh else sum(1 for url in urls if (manifest.get(url) or {}).get('failed'))
+
+    print(f"🖼️ Унікальних зображень: {len(urls)}, до обробки: {len(todo)}, пропущено з помилкою: {skipped}")
+    stats = {'created': 0, 'dedup': 0, 'unchanged': 0, 'failed': 0, 'pruned': 0, 'removed': 0}
+
+    with ThreadPoolExecutor(max_workers=IMAGE_WORKERS) as executor:
+        futures = {executor.submit(process_image, url, manifest.get(url)): url for url in todo}
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                url, entry, status = future.result()
+            except Exception as e:
+                error_msg = f"Помилка зображення {url}: {e}"
+                print(error_msg)
+                log_error(error_msg)
+                # Запам'ятовуємо помилку, щоб не завантажувати і не логувати той самий URL щоразу
+                manifest[url] = {
+                    **(manifest.get(url) or {}),
+                    'failed': True,
+                    'last_error': str(e),
+                    'updated': datetime.now().strftime('%Y-%m-%d')
+                }
+                stats['failed'] += 1
+                continue
+            manifest[url] = entry
+            stats[status] += 1
+
+    if prune and urls:
+        # Товари зникли з CSV - їх мініатюри стають сиротами і видаляються нижче
+        # (якщо CSV не знайдено зовсім, маніфест не чиститься)
+        current = set(urls)
+        for url in [url for url in manifest if url not in current]:
+            del manifest[url]
+            stats['pruned'] += 1
+
+    save_manifest(manifest, manifest_file)
+    stats['removed'] = remove_orphan_thumbnails(manifest)
+    print(f"💾 Маніфест збережено в {manifest_file}: " +
+          ", ".join(f"{key}={value}" for key, value in stats.items()))
+    return stats
+
+
+def main():
+    refresh = '--refresh' in sys.argv[1:]
+    csv_files = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+
+    print("🖼️ Кешування зображень і мініатюр")
+    print("=" * 60)
+    # Для окремих файлів маніфест не чиститься - в ньому й зображення з інших CSV
+    update_image_cache(csv_files or [BUY_OUTPUT_FILE, SELL_OUTPUT_FILE], refresh=refresh, prune=not csv_files)
+    print("=" * 60)
+    print("✅ Обробка завершена!")
+
+
+if __name__ == "__main__":
+    main()
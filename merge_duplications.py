@@ -3,11 +3,53 @@ import sys
 import logging
 from datetime import datetime
 
+import price_matrix
+
 # Налаштування логування
 logging.basicConfig(filename='merge_log.txt', level=logging.INFO,
                     format='%(asctime)s - %(levelname)s - %(message)s')
 
 
+def merge_rows_by_sku(df, date_columns):
+    """
+    Групує рядки DataFrame за SKU без виводу і запису у файл.
+    Повертає DataFrame з колонками sku, category, car_name, image_url + date_columns,
+    відсортований за SKU.
+    - category: перша непорожня
+    - ціни: для кожної дати остання непорожня в порядку рядків
+    - car_name, image_url: з рядка з найновішою ціною (при рівності - перший),
+      якщо цін немає - з рядка з найдовшою назвою
+    """
+    df = df[df['sku'].notna()].reset_index(drop=True)
+
+    # Найновіша дата з непорожньою ціною для кожного рядка ('' - цін немає)
+    sorted_dates = sorted(date_columns)
+    present = df[sorted_dates].notna().to_numpy()
+    has_prices = present.any(axis=1)
+    last_position = len(sorted_dates) - 1 - present[:, ::-1].argmax(axis=1) if sorted_dates else None
+    latest = pd.Series('', index=df.index, dtype=object)
+    if sorted_dates:
+        latest[has_prices] = pd.Index(sorted_dates)[last_position[has_prices]]
+
+    # Довжина назви важлива лише для рядків без цін
+    name_length = df['car_name'].str.len().fillna(-1).where(~has_prices, 0)
+    ranking = pd.DataFrame({'sku': df['sku'], 'latest': latest, 'name_length': name_length})
+    best_rows = (ranking.sort_values(['sku', 'latest', 'name_length'], ascending=[True, False, False], kind='stable')
+                 .drop_duplicates('sku', keep='first')
+                 .index)
+    latest_names_images = df.loc[best_rows, ['sku', 'car_name', 'image_url']].set_index('sku')
+
+    grouped = df.groupby('sku', sort=True)
+    merged_df = pd.concat([
+        grouped['category'].first(),
+        latest_names_images,
+        grouped[date_columns].last()  # last() пропускає NaN - остання непорожня ціна
+    ], axis=1).reset_index()
+
+    final_columns = ['sku', 'category', 'car_name', 'image_url'] + date_columns
+    return merged_df[final_columns]
+
+
 def merge_duplicates_by_sku(input_file, output_file=None):
     """
     Об'єднує дублікати товарів на основі SKU.
@@ -22,7 +64,7 @@ def merge_duplicates_by_sku(input_file, output_file=None):
 
     # Читання CSV-файлу
     try:
-        df = pd.read_csv(input_file, encoding='utf-8-sig')
+        df = price_matrix.load_prices(input_file)
     except FileNotFoundError:
         error_msg = f"Файл {input_file} не знайдено."
         print(f"❌ Помилка: {error_msg}")
@@ -39,8 +81,7 @@ def merge_duplicates_by_sku(input_file, output_file=None):
         logging.error(error_msg)
         return
 
-    # Колонки з датами (формат 2025-XX-XX)
-    date_columns = [col for col in df.columns if col.startswith('20')]
+    date_columns = [col for col in df.columns if price_matrix.is_date_column(col)]
     print(f"📅 Знайдено колонок з датами: {len(date_columns)}")
 
     # Знаходимо дублікати SKU
@@ -58,54 +99,7 @@ def merge_duplicates_by_sku(input_file, output_file=None):
     else:
         print("\n✅ Дублікатів не знайдено!")
 
-    # Функція для вибору найновішої назви
-    def get_latest_name_and_image(group):
-        """
-        Вибирає назву і зображення з рядка, що має найновішу ціну.
-        Якщо цін немає, бере найдовшу назву.
-        """
-        latest_date = None
-        latest_row = None
-
-        for idx, row in group.iterrows():
-            # Знаходимо останню дату з непорожньою ціною
-            non_null_dates = [col for col in date_columns if pd.notnull(row[col])]
-            if non_null_dates:
-                current_latest = max(non_null_dates)
-                if latest_date is None or current_latest > latest_date:
-                    latest_date = current_latest
-                    latest_row = row
-
-        if latest_row is None:
-            # Якщо цін немає, беремо рядок із найдовшою назвою
-            latest_row = group.loc[group['car_name'].str.len().idxmax()]
-
-        return pd.Series({
-            'car_name': latest_row['car_name'],
-            'image_url': latest_row['image_url']
-        })
-
-    # Об'єднуємо дані за SKU
-    agg_dict = {
-        'category': 'first',  # Беремо першу категорію (повинна бути однакова)
-    }
-
-    # Для дат беремо максимальне значення (непорожнє)
-    for date_col in date_columns:
-        agg_dict[date_col] = lambda x: x.dropna().iloc[-1] if not x.dropna().empty else pd.NA
-
-    # Групуємо за SKU
-    merged_df = df.groupby('sku', as_index=False).agg(agg_dict)
-
-    # Отримуємо найновіші назви та зображення
-    latest_names_images = df.groupby('sku').apply(get_latest_name_and_image).reset_index()
-
-    # Об'єднуємо з основним DataFrame
-    merged_df = merged_df.merge(latest_names_images, on='sku', how='left')
-
-    # Переставляємо колонки в потрібному порядку
-    final_columns = ['sku', 'category', 'car_name', 'image_url'] + date_columns
-    merged_df = merged_df[final_columns]
+    merged_df = merge_rows_by_sku(df, date_columns)
 
     # Логування результатів
     original_count = len(df)
@@ -0,0 +1,168 @@
+import pandas as pd
+import sys
+import os
+import json
+import logging
+
+import price_events
+import price_matrix
+from merge_duplications import merge_rows_by_sku
+from price_finder import DEFAULT_SECTION, SECTION_PATTERN, section_paths
+
+
+def merge_price_files(output_file, shard_files):
+    """
+    Додає результати шардів до основного CSV.
+    Порядок детермінований: основний файл, потім шарди за номером -
+    для однакової дати перемагає ціна з шарда (merge_rows_by_sku бере останню непорожню).
+    """
+    if not shard_files:
+        return 0
+
+    frames = []
+    for file_path in [output_file] + shard_files:
+        try:
+            frames.append(price_matrix.load_prices(file_path))
+        except FileNotFoundError:
+            continue
+
+    df = pd.concat(frames, ignore_index=True, sort=False)
+    date_columns = sorted(col for col in df.columns if price_matrix.is_date_column(col))
+    merged_df = merge_rows_by_sku(df, date_columns)
+
+    os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+    merged_df.to_csv(output_file, index=False, encoding='utf-8-sig', sep=',')
+    print(f"💾 {output_file}: {len(df)} рядків -> {len(merged_df)} SKU")
+    return len(merged_df)
+
+
+def merge_price_indexes(output_file, shard_files):
+    """Для кожного SKU залишає запис з найпізнішим last_seen."""
+    index = price_events.load_price_index(output_file)
+    for file_path in shard_files:
+        shard_index = price_events.load_price_index(file_path)
+        if shard_index is None:
+            continue
+        if index is None:
+            index = price_events.empty_index()
+            index['cycle_started'] = shard_index.get('cycle_started', index['cycle_started'])
+        for sku, entry in shard_index['items'].items():
+            current = index['items'].get(sku)
+            if current is None or entry.get('last_seen', '') > current.get('last_seen', ''):
+                index['items'][sku] = entry
+
+    if index is not None:
+        price_events.save_price_index(index, output_file)
+
+
+def merge_event_files(output_file, shard_files):
+    """Зливає події шардів у спільну стрічку, впорядковуючи за часом."""
+    events = []
+    seen = set()
+    for file_path in shard_files:
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                lines = [line.strip() for line in f if line.strip()]
+        except FileNotFoundError:
+            continue
+        for line in lines:
+            # Той самий товар міг потрапити у два шарди, якщо сторінки зсунулись під час обходу
+            if line not in seen:
+                seen.add(line)
+                events.append(json.loads(line))
+
+    events.sort(key=lambda event: event['ts'])
+    price_events.append_events(events, output_file)
+    return len(events)
+
+
+def merge_error_logs(output_file, shard_files):
+    for file_path in shard_files:
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                content = f.read()
+        except FileNotFoundError:
+            continue
+        os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+        with open(output_file, 'a', encoding='utf-8') as f:
+            f.write(content)
+
+
+def close_shards_cycle(index_file, events_file, cycle_files, shard_count):
+    """
+    Коли кожен шард пройшов усі свої сторінки, спільний індекс бачив увесь розділ -
+    тепер можна визначити зниклі товари. Повертає кількість подій disappeared.
+    Шарди продовжують парсити і після свого проходу, тому новий цикл почався
+    з найранішої мітки, а не в момент об'єднання.
+    """
+    if len(cycle_files) < shard_count:
+        print(f"🔁 Цикл завершили шардів: {len(cycle_files)} з {shard_count}")
+        return 0
+
+    index = price_events.load_price_index(index_file)
+    if index is None:
+        return 0
+    wrapped = []
+    for file_path in cycle_files:
+        with open(file_path, 'r') as f:
+            wrapped.append(f.read().strip())
+    events = price_events.close_cycle(index, next_cycle_started=min(wrapped))
+    price_events.save_price_index(index, index_file)
+    price_events.append_events(events, events_file)
+    for file_path in cycle_files:
+        os.remove(file_path)
+    print(f"🔁 Усі шарди завершили цикл, зниклих товарів: {len(events)}")
+    return len(events)
+
+
+def merge_shards(section=DEFAULT_SECTION, shard_count=1):
+    """
+    Об'єднує результати шардів розділу в основні файли і видаляє
+    використані частини. Файли прогресу шардів залишаються - це їх стан,
+    мітки завершеного циклу - доки цикл не пройдуть усі шарди.
+    """
+    print(f"🧩 Об'єднання {shard_count} шардів розділу {section}")
+    print("=" * 60)
+
+    target = section_paths(section)
+    shards = [section_paths(section, shard_index, shard_count) for shard_index in range(shard_count)]
+
+    def existing(key):
+        return [shard[key] for shard in shards if os.path.exists(shard[key])]
+
+    merge_price_files(target['buy'], existing('buy'))
+    merge_price_files(target['sell'], existing('sell'))
+    merge_price_indexes(target['last_prices'], existing('last_prices'))
+    events_count = merge_event_files(target['events'], existing('events'))
+    print(f"📰 Подій додано: {events_count}")
+    merge_error_logs(target['errors'], existing('errors'))
+    close_shards_cycle(target['last_prices'], target['events'], existing('cycle_done'), shard_count)
+
+    for key in ('buy', 'sell', 'last_prices', 'events', 'errors'):
+        for file_path in existing(key):
+            os.remove(file_path)
+
+    logging.info(f"Об'єднано {shard_count} шардів розділу {section}")
+    print("=" * 60)
+    print("✅ Об'єднання завершено!")
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Використання:")
+        print("  python merge_shards.py <shard_count> [section]")
+        print("\nПриклад:")
+        print("  python merge_shards.py 4")
+        print("  python merge_shards.py 4 matchbox")
+        sys.exit(1)
+
+    shard_count = int(sys.argv[1])
+    section = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_SECTION
+    if shard_count < 1 or not SECTION_PATTERN.fullmatch(section):
+        print(f"❌ Помилка: невірна кількість шардів {shard_count} або назва розділу {section!r}")
+        sys.exit(1)
+    merge_shards(section, shard_count)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,10 @@
-import pandas as pd
 import re
 import sys
 import os
 from datetime import datetime
 
+import price_matrix
+
 
 def extract_sku(car_name):
     """
@@ -48,7 +49,7 @@ def migrate_csv_add_sku(input_file, output_file=None, remove_no_sku=True):
 
     # Читання CSV
     try:
-        df = pd.read_csv(input_file, encoding='utf-8-sig')
+        df = price_matrix.load_prices(input_file)
         print(f"✅ Завантажено файл: {input_file}")
         print(f"📊 Кількість рядків: {len(df)}")
     except FileNotFoundError:
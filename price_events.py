@@ -0,0 +1,185 @@
+import json
+import os
+from datetime import datetime, timedelta
+
+import price_matrix
+
+# Налаштування
+LAST_PRICES_FILE = "last_prices.json"
+EVENTS_FILE = "price_events.jsonl"
+
+# Типи подій
+EVENT_NEW = "new"
+EVENT_PRICE_UP = "price_up"
+EVENT_PRICE_DOWN = "price_down"
+EVENT_BACK_IN_STOCK = "back_in_stock"
+EVENT_DISAPPEARED = "disappeared"
+
+PRICE_SIDES = ('buy', 'sell')
+# Скільки днів займає повний обхід сторінок; товари без ціни довше - вже не в наявності
+CRAWL_CYCLE_DAYS = 2
+
+
+def now_timestamp():
+    return datetime.now().strftime('%Y-%m-%dT%H:%M:%S')
+
+
+def empty_index():
+    # cycle_started = None: поточний цикл неповний (почався не з першої сторінки)
+    return {'cycle_started': None, 'items': {}}
+
+
+def load_price_index(file_path=LAST_PRICES_FILE):
+    """
+    Завантажує індекс останніх відомих цін.
+    Структура: {'cycle_started': ts або None,
+                'items': {sku: {'buy', 'sell', 'car_name', 'category', 'last_seen', 'in_stock'}}}
+    Повертає None, якщо файлу ще немає.
+    """
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_price_index(index, file_path=LAST_PRICES_FILE):
+    os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+    tmp_path = file_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    os.replace(tmp_path, file_path)
+
+
+def _last_prices_from_csv(file_path):
+    """Повертає {sku: (остання непорожня ціна, дата цієї ціни, назва, категорія)} з широкого CSV."""
+    try:
+        matrix = price_matrix.load_price_matrix(file_path, columns=['sku', 'category', 'car_name'])
+    except FileNotFoundError:
+        return {}
+
+    last, last_dates = price_matrix.last_prices(matrix)
+    meta = matrix.meta.astype(object).where(matrix.meta.notna(), None)
+    # float32 не зберігає копійки точно (123.45 -> 123.4499...), а скрапер порівнює з float64
+    return {
+        sku: (round(float(price), 2), date, car_name, category)
+        for sku, category, car_name, price, date in zip(meta['sku'], meta['category'], meta['car_name'],
+                                                        last, last_dates)
+        if date is not None
+    }
+
+
+def build_index_from_csv(buy_file, sell_file):
+    """
+    Створює початковий індекс з існуючих CSV, щоб перший запуск
+    не позначив усю історію як нові товари.
+    Скрапер у цей момент посеред циклу, тому cycle_started не задається -
+    перший неповний цикл не породжує подій disappeared.
+    """
+    index = empty_index()
+    buy_prices = _last_prices_from_csv(buy_file)
+    sell_prices = _last_prices_from_csv(sell_file)
+
+    last_dates = [value[1] for value in list(buy_prices.values()) + list(sell_prices.values())]
+    newest_date = max(last_dates, default='')
+    stale_before = ''
+    if newest_date:
+        stale_before = (datetime.strptime(newest_date, '%Y-%m-%d') -
+                        timedelta(days=CRAWL_CYCLE_DAYS)).strftime('%Y-%m-%d')
+
+    for sku in set(buy_prices) | set(sell_prices):
+        buy, buy_date, buy_name, buy_category = buy_prices.get(sku, (None, '', None, None))
+        sell, sell_date, sell_name, sell_category = sell_prices.get(sku, (None, '', None, None))
+        last_seen = max(buy_date, sell_date)
+        index['items'][sku] = {
+            'buy': buy,
+            'sell': sell,
+            'car_name': buy_name or sell_name,
+            'category': buy_category or sell_category,
+            'last_seen': last_seen,
+            # Товар без ціни довше за цикл обходу вже зник з сайту
+            'in_stock': last_seen >= stale_before
+        }
+    print(f"🗂️ Створено індекс цін з CSV: {len(index['items'])} SKU")
+    return index
+
+
+def apply_item(index, item, ts=None, add_new=True):
+    """
+    Оновлює індекс для одного спарсеного товару і повертає список подій.
+    item - результат scrape_product_page() (sku, car_name, buy_price, sell_price, category).
+    add_new=False - лише для SKU, які вже є в індексі (товар нижче порогу ціни).
+    """
+    ts = ts or now_timestamp()
+    sku = item['sku']
+    prices = {'buy': item['buy_price'], 'sell': item['sell_price']}
+    names = {'car_name': item['car_name'], 'category': item['category']}
+    base_event = {'ts': ts, 'sku': sku, **names}
+    events = []
+
+    entry = index['items'].get(sku)
+    if entry is None:
+        if not add_new:
+            return events
+        events.append({**base_event, 'event': EVENT_NEW, 'buy': prices['buy'], 'sell': prices['sell']})
+        index['items'][sku] = {**prices, **names, 'last_seen': ts, 'in_stock': True}
+        return events
+
+    if not entry.get('in_stock', True):
+        events.append({**base_event, 'event': EVENT_BACK_IN_STOCK, 'buy': prices['buy'], 'sell': prices['sell']})
+
+    for side in PRICE_SIDES:
+        old, new = entry.get(side), prices[side]
+        if old is None or new is None or old == new:
+            continue
+        events.append({
+            **base_event,
+            'event': EVENT_PRICE_UP if new > old else EVENT_PRICE_DOWN,
+            'side': side,
+            'old': old,
+            'new': new
+        })
+
+    entry.update(prices)
+    entry.update(names)
+    entry['last_seen'] = ts
+    entry['in_stock'] = True
+    return events
+
+
+def close_cycle(index, ts=None, next_cycle_started=None):
+    """
+    Викликається, коли скрапер пройшов усі сторінки і почав спочатку.
+    SKU, які не зустрічались з початку циклу, позначаються як зниклі.
+    next_cycle_started - коли почався новий цикл, якщо раніше за ts
+    (шарди повертаються на початок до об'єднання).
+    """
+    ts = ts or now_timestamp()
+    cycle_started = index.get('cycle_started')
+    index['cycle_started'] = next_cycle_started or ts
+    if not cycle_started:
+        # Цикл після створення індексу почався з середини - не всі сторінки пройдено
+        return []
+
+    events = []
+    for sku, entry in index['items'].items():
+        if entry.get('in_stock', True) and entry.get('last_seen', '') < cycle_started:
+            entry['in_stock'] = False
+            events.append({
+                'ts': ts,
+                'sku': sku,
+                'car_name': entry.get('car_name'),
+                'category': entry.get('category'),
+                'event': EVENT_DISAPPEARED,
+                'buy': entry.get('buy'),
+                'sell': entry.get('sell')
+            })
+    return events
+
+
+def append_events(events, file_path=EVENTS_FILE):
+    # Файл створюється навіть без подій, щоб його завжди можна було закомітити
+    os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+    with open(file_path, 'a', encoding='utf-8') as f:
+        for event in events:
+            f.write(json.dumps(event, ensure_ascii=False) + "\n")
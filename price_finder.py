@@ -7,13 +7,31 @@ import re
 from concurrent.futures import ThreadPoolExecutor
 import threading
 import random
+import math
 import os
+import argparse
+import multiprocessing
+
+import price_events
+import price_matrix
 
 # Налаштування
-BASE_URL = "https://retromagaz.com/hot-wheels?page="
+SITE_URL = "https://retromagaz.com"
+DEFAULT_SECTION = "hot-wheels"
+# Назва розділу потрапляє в URL і шляхи до файлів, тому лише slug
+SECTION_PATTERN = re.compile(r'[a-z0-9-]+')
+SECTION = DEFAULT_SECTION
+BASE_URL = f"{SITE_URL}/{SECTION}?page="
+SECTIONS_DIR = "data"
+SHARDS_DIR = "shards"
+SHARD_INDEX = 0
+SHARD_COUNT = 1
 BUY_OUTPUT_FILE = "car_prices.csv"
 SELL_OUTPUT_FILE = "sell_car_prices.csv"
 PROGRESS_FILE = "progress.txt"
+LAST_PRICES_FILE = price_events.LAST_PRICES_FILE
+EVENTS_FILE = price_events.EVENTS_FILE
+CYCLE_DONE_FILE = "cycle_done.txt"
 ERROR_LOG_FILE = "scraper_errors.log"
 CURRENT_DATE = datetime.now().strftime('%Y-%m-%d')
 HEADERS = {
@@ -41,6 +59,8 @@ MAX_WORKERS = 20
 # Потокобезпечний список для даних
 BUY_DATA = []
 SELL_DATA = []
+PRICE_INDEX = None
+PRICE_EVENTS = []
 DATA_LOCK = threading.Lock()
 
 # Параметри фільтрування
@@ -53,8 +73,69 @@ SKIP_TREASURE_HUNTS = False
 SKIP_TEAM_TRANSPORT = False
 
 
+# Шляхи до файлів стану і результатів
+def section_paths(section, shard_index=None, shard_count=1):
+    """
+    Повертає шляхи до файлів для розділу сайту.
+    - hot-wheels без шардингу: файли в корені репозиторію (як і раніше)
+    - інші розділи: data/<section>/
+    - шард: shards/<section>/<i>-of-<N>/ (власний прогрес і частина результатів)
+    """
+    if shard_index is not None:
+        base_dir = os.path.join(SHARDS_DIR, section, f"{shard_index}-of-{shard_count}")
+    elif section == DEFAULT_SECTION:
+        base_dir = ''
+    else:
+        base_dir = os.path.join(SECTIONS_DIR, section)
+    return {
+        'buy': os.path.join(base_dir, "car_prices.csv"),
+        'sell': os.path.join(base_dir, "sell_car_prices.csv"),
+        'progress': os.path.join(base_dir, "progress.txt"),
+        'errors': os.path.join(base_dir, "scraper_errors.log"),
+        'last_prices': os.path.join(base_dir, price_events.LAST_PRICES_FILE),
+        'events': os.path.join(base_dir, price_events.EVENTS_FILE),
+        # Мітка шарда: час, коли він уперше пройшов усі свої сторінки з моменту останнього об'єднання циклу
+        'cycle_done': os.path.join(base_dir, "cycle_done.txt")
+    }
+
+
+def configure(section=DEFAULT_SECTION, shard_index=None, shard_count=1):
+    """Налаштовує глобальні шляхи і URL для розділу та (опційно) шарда."""
+    global SECTION, BASE_URL, SHARD_INDEX, SHARD_COUNT
+    global BUY_OUTPUT_FILE, SELL_OUTPUT_FILE, PROGRESS_FILE, ERROR_LOG_FILE, LAST_PRICES_FILE, EVENTS_FILE
+    global CYCLE_DONE_FILE
+
+    if shard_index is not None and not 0 <= shard_index < shard_count:
+        raise ValueError(f"Невірний номер шарда {shard_index} для {shard_count} шардів")
+
+    SECTION = section
+    BASE_URL = f"{SITE_URL}/{section}?page="
+    SHARD_INDEX = shard_index or 0
+    SHARD_COUNT = shard_count if shard_index is not None else 1
+
+    paths = section_paths(section, shard_index, shard_count)
+    BUY_OUTPUT_FILE = paths['buy']
+    SELL_OUTPUT_FILE = paths['sell']
+    PROGRESS_FILE = paths['progress']
+    ERROR_LOG_FILE = paths['errors']
+    LAST_PRICES_FILE = paths['last_prices']
+    EVENTS_FILE = paths['events']
+    CYCLE_DONE_FILE = paths['cycle_done']
+
+
+# Сторінки шарда: позиція 1, 2, 3... відповідає сторінкам i+1, i+1+N, i+1+2N...
+# Без шардингу (N=1) позиція дорівнює номеру сторінки.
+def shard_page(position):
+    return (position - 1) * SHARD_COUNT + SHARD_INDEX + 1
+
+
+def shard_positions(max_pages):
+    return max((max_pages - SHARD_INDEX + SHARD_COUNT - 1) // SHARD_COUNT, 1)
+
+
 # Функція для логування помилок
 def log_error(message):
+    os.makedirs(os.path.dirname(ERROR_LOG_FILE) or '.', exist_ok=True)
     with open(ERROR_LOG_FILE, 'a', encoding='utf-8') as f:
         timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         f.write(f"[{timestamp}] {message}\n")
@@ -231,7 +312,16 @@ def scrape_product_page(url):
             }
         else:
             print(f"Пропущено: {title} - ціна покупки {buy_price} нижче порогу {threshold}")
-            return None
+            # У CSV не потрапляє, але товар є на сайті - індекс цін має знати про зміну ціни
+            return {
+                'sku': sku,
+                'car_name': clean_title(title) or title,
+                'buy_price': buy_price,
+                'sell_price': sell_price,
+                'category': category,
+                'image_url': None,
+                'below_threshold': True
+            }
 
     except Exception as e:
         error_msg = f"Помилка на сторінці {url}: {e}"
@@ -244,12 +334,13 @@ def scrape_product_page(url):
 def update_csv(file_path, data_list, price_key):
     os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
     try:
-        df = pd.read_csv(file_path, encoding='utf-8-sig')
+        # Категорія перезаписується по рядках, тому тут вона - звичайний рядок
+        df = price_matrix.load_prices(file_path, dtypes={'category': 'object'})
     except FileNotFoundError:
-        df = pd.DataFrame(columns=['sku', 'category', 'car_name', 'image_url'])
+        df = pd.DataFrame(columns=price_matrix.METADATA_COLUMNS)
 
     if CURRENT_DATE not in df.columns:
-        df[CURRENT_DATE] = pd.NA
+        df[CURRENT_DATE] = pd.Series(index=df.index, dtype=price_matrix.PRICE_DTYPE)
 
     for item in data_list:
         sku = item['sku']
@@ -279,6 +370,48 @@ def update_csv(file_path, data_list, price_key):
     print(f"💾 Дані збережено в {file_path}")
 
 
+# Функції для індексу останніх цін і стрічки подій
+def load_price_index():
+    global PRICE_INDEX
+    PRICE_INDEX = price_events.load_price_index(LAST_PRICES_FILE)
+    if PRICE_INDEX is not None:
+        return
+
+    # Шард починає з об'єднаного індексу свого розділу
+    section = section_paths(SECTION)
+    PRICE_INDEX = price_events.load_price_index(section['last_prices'])
+    if PRICE_INDEX is None:
+        PRICE_INDEX = price_events.build_index_from_csv(section['buy'], section['sell'])
+
+
+def flush_price_events():
+    """Дописує накопичені події в JSONL і зберігає індекс. Викликати під DATA_LOCK."""
+    global PRICE_EVENTS
+    price_events.append_events(PRICE_EVENTS, EVENTS_FILE)
+    if PRICE_EVENTS:
+        print(f"📰 Записано подій: {len(PRICE_EVENTS)} в {EVENTS_FILE}")
+    PRICE_EVENTS = []
+    price_events.save_price_index(PRICE_INDEX, LAST_PRICES_FILE)
+
+
+def finish_cycle():
+    """Усі сторінки пройдено - позначаємо товари, яких не було в циклі, як зниклі."""
+    if SHARD_COUNT > 1:
+        # Товари переходять між сторінками різних шардів, тому окремий шард не може знати, що товар зник.
+        # Шард лише позначає свій прохід, а зниклі товари визначає merge_shards, коли пройшли всі шарди.
+        # Час першого проходу не перезаписується - з нього для шарда почався новий цикл.
+        if not os.path.exists(CYCLE_DONE_FILE):
+            os.makedirs(os.path.dirname(CYCLE_DONE_FILE) or '.', exist_ok=True)
+            with open(CYCLE_DONE_FILE, "w") as f:
+                f.write(price_events.now_timestamp())
+        print(f"🔁 Цикл сторінок шарда {SHARD_INDEX} завершено")
+        return
+    with DATA_LOCK:
+        events = price_events.close_cycle(PRICE_INDEX)
+        PRICE_EVENTS.extend(events)
+    print(f"🔁 Цикл сторінок завершено, зниклих товарів: {len(events)}")
+
+
 # Функція для парсингу сторінки пагінації
 def scrape_page(page_num):
     global BUY_DATA, SELL_DATA
@@ -307,6 +440,11 @@ def scrape_page(page_num):
                 result = future.result()
                 if result:
                     with DATA_LOCK:
+                        if result.get('below_threshold'):
+                            # Нижче порогу: лише price_down / back_in_stock для SKU, що вже відстежуються
+                            PRICE_EVENTS.extend(price_events.apply_item(PRICE_INDEX, result, add_new=False))
+                            continue
+                        PRICE_EVENTS.extend(price_events.apply_item(PRICE_INDEX, result))
                         BUY_DATA.append({
                             'sku': result['sku'],
                             'car_name': result['car_name'],
@@ -336,12 +474,19 @@ def main():
     global BUY_DATA, SELL_DATA
 
     print("🚗 Запуск скрапера Hot Wheels з підтримкою SKU")
+    if SHARD_COUNT > 1 or SECTION != DEFAULT_SECTION:
+        print(f"🧩 Розділ: {SECTION}, шард {SHARD_INDEX + 1} з {SHARD_COUNT}")
     print("=" * 60)
 
     response = requests.get(BASE_URL + "1", headers=HEADERS)
     soup = BeautifulSoup(response.text, 'html.parser')
     pagination = soup.find_all('li', class_='item')
     max_pages = max([int(li['data-p']) for li in pagination if 'data-p' in li.attrs], default=1)
+    # Прогрес рахується в позиціях сторінок свого шарда
+    max_positions = shard_positions(max_pages)
+
+    load_price_index()
+    os.makedirs(os.path.dirname(PROGRESS_FILE) or '.', exist_ok=True)
 
     current_page = 0
     iteration = 1
@@ -352,20 +497,25 @@ def main():
         with open(PROGRESS_FILE, "w") as f:
             f.write(str(current_page))
 
-    if current_page >= max_pages:
+    if current_page >= max_positions:
         current_page = 0
+        finish_cycle()
         with open(PROGRESS_FILE, "w") as f:
             f.write(str(current_page))
 
+    # Денний ліміт ділиться між шардами, тож навантаження на сайт не залежить від їх кількості,
+    # і не перевищує кількість позицій шарда, щоб жодна сторінка не парсилась двічі за запуск
+    pages_per_run = min(math.ceil(PAGES_PER_DAY / SHARD_COUNT), max_positions)
     start_page = current_page + 1
-    end_page = ((start_page - 1 + PAGES_PER_DAY) % max_pages) + 1
+    end_page = ((start_page - 1 + pages_per_run) % max_positions) + 1
 
-    print(f"📊 Start page: {start_page}, End page: {end_page}, Max pages: {max_pages}")
+    print(f"📊 Start page: {shard_page(start_page)}, End page: {shard_page(end_page)}, Max pages: {max_pages}, "
+          f"Pages per run: {pages_per_run}")
     print("=" * 60)
 
-    while (start_page != end_page) or (iteration < PAGES_PER_DAY):
-        if not scrape_page(start_page):
-            print(f"Парсинг завершено на сторінці {start_page}")
+    while (start_page != end_page) or (iteration < pages_per_run):
+        if not scrape_page(shard_page(start_page)):
+            print(f"Парсинг завершено на сторінці {shard_page(start_page)}")
             break
 
         if start_page % SAVE_INTERVAL == 0 or start_page == end_page:
@@ -376,15 +526,19 @@ def main():
                 if SELL_DATA:
                     update_csv(SELL_OUTPUT_FILE, SELL_DATA, 'price')
                     SELL_DATA = []
+                flush_price_events()
 
         start_page += 1
         iteration += 1
-        if start_page > max_pages:
-            start_page = 0
+        if start_page > max_positions:
+            # Повертаємось на першу сторінку свого шарда
+            start_page = 1
+            finish_cycle()
         time.sleep(2)
 
+        # У файлі прогресу - остання спарсена позиція, наступний запуск почне з неї + 1
         with open(PROGRESS_FILE, "w") as f:
-            f.write(str(start_page))
+            f.write(str(start_page - 1))
 
     if BUY_DATA or SELL_DATA:
         with DATA_LOCK:
@@ -397,9 +551,64 @@ def main():
     else:
         print("Немає даних для збереження")
 
+    with DATA_LOCK:
+        flush_price_events()
+
     print("=" * 60)
     print("✅ Парсинг завершено!")
 
 
+def run_shard(section, shard_index, shard_count):
+    configure(section, shard_index, shard_count)
+    main()
+
+
+# Запуск N шардів в окремих процесах з подальшим об'єднанням
+def run_sharded(section, shard_count):
+    import merge_shards
+
+    processes = [
+        multiprocessing.Process(target=run_shard, args=(section, shard_index, shard_count))
+        for shard_index in range(shard_count)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    failed = [i for i, process in enumerate(processes) if process.exitcode != 0]
+    if failed:
+        log_error(f"Шарди завершились з помилкою: {failed}")
+        print(f"⚠️ Шарди завершились з помилкою: {failed}")
+
+    merge_shards.merge_shards(section, shard_count)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Скрапер цін retromagaz.com")
+    parser.add_argument('--section', default=DEFAULT_SECTION,
+                        help="Розділ сайту, наприклад hot-wheels (за замовчуванням)")
+    parser.add_argument('--shards', type=int, default=1,
+                        help="Кількість шардів, на які ділиться простір сторінок")
+    parser.add_argument('--shard', type=int, default=None,
+                        help="Номер шарда (0..N-1) - запускає лише один шард, без об'єднання (для матриці GitHub Actions)")
+    args = parser.parse_args()
+    if not SECTION_PATTERN.fullmatch(args.section):
+        parser.error("--section має містити лише малі латинські літери, цифри і '-'")
+    if args.shards < 1:
+        parser.error("--shards має бути не менше 1")
+    if args.shard is not None and not 0 <= args.shard < args.shards:
+        parser.error("--shard має бути в межах 0..N-1")
+    return args
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    args = parse_args()
+    if args.shard is not None:
+        run_shard(args.section, args.shard, args.shards)
+    elif args.shards > 1:
+        configure(args.section)
+        run_sharded(args.section, args.shards)
+    else:
+        configure(args.section)
+        main()
\ No newline at end of file
@@ -0,0 +1,139 @@
+import csv
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# Налаштування
+METADATA_COLUMNS = ['sku', 'category', 'car_name', 'image_url']
+# float32 (~7 значущих цифр): цілі гривні точні до 16 млн, ціни з копійками - наближені,
+# тому для порівняння з float64 їх треба округлювати до 2 знаків
+PRICE_DTYPE = 'float32'
+CATEGORICAL_COLUMNS = {'category'}
+CHUNK_ROWS = 1000
+
+# CSR-представлення цін: ціни рядка i - data[indptr[i]:indptr[i + 1]],
+# їх дати - dates[indices[indptr[i]:indptr[i + 1]]]
+PriceMatrix = namedtuple('PriceMatrix', ['meta', 'dates', 'indptr', 'indices', 'data'])
+
+
+def is_date_column(column):
+    # Колонки з датами (формат 2025-XX-XX)
+    return column.startswith('20')
+
+
+def read_columns(file_path):
+    """Читає лише заголовок CSV."""
+    with open(file_path, 'r', encoding='utf-8-sig', newline='') as f:
+        return next(csv.reader(f), [])
+
+
+def select_dates(all_dates, dates=None, since=None, last=None):
+    """
+    Відбирає колонки з датами у порядку файлу.
+    - dates: явний список дат (відсутні у файлі ігноруються)
+    - since: лише дати >= since ('YYYY-MM-DD')
+    - last: лише останні N дат
+    """
+    selected = list(all_dates)
+    if dates is not None:
+        wanted = set(dates)
+        selected = [date for date in selected if date in wanted]
+    if since is not None:
+        selected = [date for date in selected if date >= since]
+    if last is not None:
+        selected = selected[-last:] if last > 0 else []
+    return selected
+
+
+def _plan(file_path, columns, dates, since, last, dtypes=None):
+    header = read_columns(file_path)
+    all_dates = [col for col in header if is_date_column(col)]
+    metadata = [col for col in header if not is_date_column(col)]
+    if columns is not None:
+        metadata = [col for col in metadata if col in columns]
+    selected_dates = select_dates(all_dates, dates, since, last)
+
+    plan_dtypes = {col: 'category' if col in CATEGORICAL_COLUMNS else 'object' for col in metadata}
+    # Готовий об'єкт dtype, а не рядок - pandas не розбирає його заново для кожної колонки
+    price_dtype = np.dtype(PRICE_DTYPE)
+    plan_dtypes.update({date: price_dtype for date in selected_dates})
+    plan_dtypes.update({col: dtype for col, dtype in (dtypes or {}).items() if col in plan_dtypes})
+    return metadata, selected_dates, plan_dtypes
+
+
+def load_prices(file_path, columns=None, dates=None, since=None, last=None, dtypes=None):
+    """
+    Завантажує широкий CSV з цінами з наперед заданими типами.
+    columns - потрібні колонки метаданих (None - усі, [] - жодної),
+    dates / since / last - які колонки з датами читати (див. select_dates),
+    dtypes - заміна типів за замовчуванням для окремих колонок.
+    Колонки, яких немає у виборі, парсер не зберігає взагалі.
+    """
+    metadata, selected_dates, dtypes = _plan(file_path, columns, dates, since, last, dtypes)
+    usecols = metadata + selected_dates
+    if not usecols:
+        return pd.DataFrame()
+
+    df = pd.read_csv(file_path, encoding='utf-8-sig', usecols=usecols, dtype=dtypes)
+    # usecols не гарантує порядок - повертаємо порядок файлу
+    return df[usecols]
+
+
+def load_price_matrix(file_path, columns=METADATA_COLUMNS, dates=None, since=None, last=None,
+                      chunksize=CHUNK_ROWS):
+    """
+    Завантажує ціни у CSR-матрицю (PriceMatrix) частинами по chunksize рядків,
+    тож щільна таблиця цін ніколи не тримається в пам'яті повністю.
+    meta - DataFrame з метаданими, dates - масив дат (індекс колонок).
+    """
+    metadata, selected_dates, dtypes = _plan(file_path, columns, dates, since, last)
+    usecols = metadata + selected_dates
+    categorical = [col for col in metadata if col in CATEGORICAL_COLUMNS]
+    # Категорії різних частин відрізняються, тому категоріальний тип - вже після об'єднання
+    dtypes.update({col: 'object' for col in categorical})
+
+    meta_parts = []
+    indptr_parts = [np.zeros(1, dtype=np.int64)]
+    indices_parts = []
+    data_parts = []
+    nnz = 0
+
+    for chunk in pd.read_csv(file_path, encoding='utf-8-sig', usecols=usecols, dtype=dtypes,
+                             chunksize=chunksize):
+        meta_parts.append(chunk[metadata])
+        values = chunk[selected_dates].to_numpy(dtype=np.float32)
+        present = ~np.isnan(values)
+        rows, cols = np.nonzero(present)
+        indices_parts.append(cols.astype(np.int32))
+        data_parts.append(values[rows, cols])
+        indptr_parts.append(nnz + np.cumsum(present.sum(axis=1), dtype=np.int64))
+        nnz += len(cols)
+
+    meta = pd.concat(meta_parts, ignore_index=True) if meta_parts else pd.DataFrame(columns=metadata)
+    for col in categorical:
+        meta[col] = meta[col].astype('category')
+
+    return PriceMatrix(
+        meta=meta,
+        dates=np.array(selected_dates, dtype=object),
+        indptr=np.concatenate(indptr_parts),
+        indices=np.concatenate(indices_parts) if indices_parts else np.zeros(0, dtype=np.int32),
+        data=np.concatenate(data_parts) if data_parts else np.zeros(0, dtype=np.float32)
+    )
+
+
+def last_prices(matrix):
+    """
+    Остання непорожня ціна і її дата для кожного рядка матриці.
+    Для рядків без цін - NaN і None.
+    """
+    row_count = len(matrix.indptr) - 1
+    prices = np.full(row_count, np.nan, dtype=np.float32)
+    last_dates = np.full(row_count, None, dtype=object)
+
+    has_prices = matrix.indptr[1:] > matrix.indptr[:-1]
+    last_positions = matrix.indptr[1:][has_prices] - 1
+    prices[has_prices] = matrix.data[last_positions]
+    last_dates[has_prices] = matrix.dates[matrix.indices[last_positions]]
+    return prices, last_dates
@@ -0,0 +1,83 @@
+import itertools
+import json
+import re
+import threading
+from datetime import datetime, timedelta
+
+import price_events
+import price_finder
+
+MAX_PAGES = 12
+ITEMS_PER_PAGE = 3
+
+
+class FakeResponse:
+    def __init__(self, text, status_code=200):
+        self.text = text
+        self.status_code = status_code
+
+
+def listing_page(page):
+    pagination = "".join(f'<li class="item" data-p="{p}"></li>' for p in range(1, MAX_PAGES + 1))
+    cards = "".join(
+        f'<div class="game-card"><a class="game-card__image" href="https://retromagaz.com/product/{page}-{k}"></a></div>'
+        for k in range(ITEMS_PER_PAGE)
+    )
+    return f"<ul>{pagination}</ul>{cards}"
+
+
+def product_page(page, item):
+    return (
+        f'<div class="product_title--top"><h1>Hot Wheels Test Car A{page:02d}{item}</h1></div>'
+        '<div class="product_info--shoping-bar"><span class="price">100 грн</span></div>'
+        '<p class="product_options-price">150 грн</p>'
+    )
+
+
+def fake_get(url, headers=None, timeout=None):
+    listing = re.search(r'\?page=(\d+)$', url)
+    if listing:
+        page = int(listing.group(1))
+        if not 1 <= page <= MAX_PAGES:
+            return FakeResponse("", 404)
+        return FakeResponse(listing_page(page))
+    page, item = re.search(r'/product/(\d+)-(\d+)$', url).groups()
+    return FakeResponse(product_page(int(page), int(item)))
+
+
+def test_sharded_crawl_does_not_report_items_still_on_site(tmp_path, monkeypatch):
+    # Усі товари весь час на сайті - жодних подій disappeared бути не повинно
+    monkeypatch.chdir(tmp_path)
+    import merge_shards
+
+    clock = itertools.count()
+    clock_lock = threading.Lock()
+
+    def fake_timestamp():
+        with clock_lock:
+            seconds = next(clock)
+        return (datetime(2025, 1, 1) + timedelta(seconds=seconds)).strftime('%Y-%m-%dT%H:%M:%S')
+
+    monkeypatch.setattr(price_events, 'now_timestamp', fake_timestamp)
+    monkeypatch.setattr(price_finder.requests, 'get', fake_get)
+    monkeypatch.setattr(price_finder.time, 'sleep', lambda seconds: None)
+    monkeypatch.setattr(price_finder, 'PAGES_PER_DAY', 4)
+
+    shard_count = 2
+    try:
+        # Достатньо запусків, щоб кожен шард кілька разів пройшов свої сторінки
+        for _ in range(10):
+            for shard_index in range(shard_count):
+                price_finder.run_shard(price_finder.DEFAULT_SECTION, shard_index, shard_count)
+            merge_shards.merge_shards(price_finder.DEFAULT_SECTION, shard_count)
+    finally:
+        price_finder.configure()
+
+    with open(price_events.EVENTS_FILE, 'r', encoding='utf-8') as f:
+        events = [json.loads(line) for line in f if line.strip()]
+    index = price_events.load_price_index(price_events.LAST_PRICES_FILE)
+
+    assert len(index['items']) == MAX_PAGES * ITEMS_PER_PAGE
+    assert index['cycle_started'] is not None
+    assert sum(event['event'] == price_events.EVENT_NEW for event in events) == MAX_PAGES * ITEMS_PER_PAGE
+    assert [event for event in events if event['event'] == price_events.EVENT_DISAPPEARED] == []
@@ -0,0 +1,49 @@
+import price_events
+
+CYCLE_STARTED = '2025-01-01T00:00:00'
+
+
+def tracked_index():
+    return {
+        'cycle_started': CYCLE_STARTED,
+        'items': {
+            'HTF13': {'buy': 400.0, 'sell': 500.0, 'car_name': 'Nissan Skyline', 'category': 'Premium',
+                      'last_seen': '2024-12-31T00:00:00', 'in_stock': True}
+        }
+    }
+
+
+def test_below_threshold_price_is_price_down_for_tracked_sku():
+    index = tracked_index()
+    item = {'sku': 'HTF13', 'car_name': 'Nissan Skyline', 'category': 'Premium', 'buy_price': 300.0, 'sell_price': 500.0}
+
+    events = price_events.apply_item(index, item, ts='2025-01-01T12:00:00', add_new=False)
+
+    assert [(event['event'], event['side'], event['new']) for event in events] == [
+        (price_events.EVENT_PRICE_DOWN, 'buy', 300.0)
+    ]
+    assert price_events.close_cycle(index, ts='2025-01-02T00:00:00') == []
+
+
+def test_below_threshold_untracked_sku_is_ignored():
+    index = tracked_index()
+    item = {'sku': 'GRN86', 'car_name': 'Honda Civic', 'category': 'MainLine', 'buy_price': 50.0, 'sell_price': 80.0}
+
+    assert price_events.apply_item(index, item, add_new=False) == []
+    assert 'GRN86' not in index['items']
+
+
+def test_disappeared_event_has_name_and_category():
+    index = tracked_index()
+
+    events = price_events.close_cycle(index, ts='2025-01-02T00:00:00')
+
+    assert events == [{
+        'ts': '2025-01-02T00:00:00',
+        'sku': 'HTF13',
+        'car_name': 'Nissan Skyline',
+        'category': 'Premium',
+        'event': price_events.EVENT_DISAPPEARED,
+        'buy': 400.0,
+        'sell': 500.0
+    }]